@@ -1,54 +1,252 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import numpy as np
-
-def load_data(file):
+import io
+import json
+import hashlib
+import re
+
+# Upper bound on server-side histogram bins
+HISTOGRAM_MAX_BINS = 100
+# Maximum rows drawn as individual points in scatter and box plots
+PLOT_SAMPLE_ROWS = 50_000
+# Default categories shown individually in count plots; the rest are grouped as "Other"
+COUNT_PLOT_MAX_CATEGORIES = 50
+# Default number of rows sent to the browser in the filtered data preview
+PREVIEW_MAX_ROWS = 10_000
+# Rows sampled to decide whether a text column is worth converting to numbers
+CLEAN_SAMPLE_ROWS = 1000
+# CSV uploads above this size get a column picker before they are parsed
+LARGE_FILE_BYTES = 100 * 1024 * 1024
+# dtype.kind characters of text-like columns: object, category, bytes and string
+CATEGORICAL_KINDS = 'OSU'
+# dtype.kind characters of columns that can be binned as numbers
+NUMERIC_KINDS = 'iuf'
+# Rows above which category aggregations are handed to Polars when installed
+POLARS_MIN_ROWS = 200_000
+# Cached helpers are keyed on a data id string instead of hashing the dataframe
+DATA_ID_HASH_FUNCS = {pd.DataFrame: lambda _: None}
+# Finds the next non-whitespace byte without slicing the upload
+NON_WHITESPACE = re.compile(rb'\S')
+
+def is_json_lines(file_bytes):
+    """Detect newline-delimited JSON by parsing its first line on its own"""
+    # Scan by index so only the first line is ever copied
+    first = NON_WHITESPACE.search(file_bytes)
+    if first is None:
+        return False
+    line_end = file_bytes.find(b'\n', first.start())
+    if line_end == -1 or NON_WHITESPACE.search(file_bytes, line_end + 1) is None:
+        return False
+    try:
+        return isinstance(json.loads(file_bytes[first.start():line_end]), dict)
+    except ValueError:
+        return False
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def parse_file(file_extension, file_bytes, usecols=None):
+    """Parse uploaded file contents, cached on the raw bytes across reruns"""
+    if file_extension == 'csv':
+        usecols = list(usecols) if usecols else None
+        # Multithreaded pyarrow parser, falling back to the default engine
+        # when pyarrow is missing or cannot handle the file
+        try:
+            df = pd.read_csv(io.BytesIO(file_bytes), engine='pyarrow', usecols=usecols)
+            # pyarrow keeps repeated headers as-is; the default engine renames
+            # them to a, a.1 so every column label stays unique
+            if not df.columns.duplicated().any():
+                return df
+        except (ImportError, ValueError):
+            pass
+        return pd.read_csv(io.BytesIO(file_bytes), usecols=usecols)
+
+    if file_extension in ['xls', 'xlsx']:
+        # Native calamine reader, falling back to openpyxl/xlrd when
+        # python-calamine or a pandas version supporting it is missing
+        try:
+            return pd.read_excel(io.BytesIO(file_bytes), engine='calamine')
+        except (ImportError, ValueError):
+            return pd.read_excel(io.BytesIO(file_bytes),
+                                 engine='openpyxl' if file_extension == 'xlsx' else None)
+
+    if is_json_lines(file_bytes):
+        # One record per line: pyarrow's JSON reader parses it natively
+        try:
+            return pd.read_json(io.BytesIO(file_bytes), lines=True, engine='pyarrow')
+        except (ImportError, ValueError):
+            return pd.read_json(io.BytesIO(file_bytes), lines=True)
+
+    return pd.read_json(io.BytesIO(file_bytes))
+
+def load_data(file, usecols=None):
     """Load data from different file formats"""
     try:
         file_extension = file.name.split('.')[-1].lower()
 
-        if file_extension == 'csv':
-            df = pd.read_csv(file)
-        elif file_extension in ['xls', 'xlsx']:
-            df = pd.read_excel(file)
-        elif file_extension == 'json':
-            df = pd.read_json(file)
-        else:
+        if file_extension not in ['csv', 'xls', 'xlsx', 'json']:
             st.error("Unsupported file format. Please upload CSV, Excel, or JSON file.")
             return None
 
-        return df
+        return parse_file(file_extension, file.getvalue(), usecols)
     except Exception as e:
         st.error(f"Error loading file: {str(e)}")
         return None
 
-def clean_data(df):
+def select_columns_to_load(uploaded_file):
+    """Let users skip columns of very large CSV files before parsing them"""
+    if not uploaded_file.name.lower().endswith('.csv') or uploaded_file.size <= LARGE_FILE_BYTES:
+        return None
+
+    try:
+        # Only the header row is read here
+        uploaded_file.seek(0)
+        header = pd.read_csv(uploaded_file, nrows=0).columns.tolist()
+    except Exception:
+        return None
+    finally:
+        uploaded_file.seek(0)
+
+    selected = st.multiselect("Columns to load", header, default=header,
+                              help="Large file: unselected columns are never parsed")
+    # An empty or full selection loads every column
+    if not selected or len(selected) == len(header):
+        return None
+    return tuple(selected)
+
+def get_uploaded_data(uploaded_file):
+    """Load an upload once and reuse it across reruns while it is unchanged
+
+    Returns the dataframe and a data id identifying it in cached helpers.
+    """
+    usecols = select_columns_to_load(uploaded_file)
+    # file_id changes on every upload, even of an edited file with the same name and size
+    upload_signature = (uploaded_file.file_id, usecols)
+    if st.session_state.get('upload_signature') != upload_signature:
+        df = load_data(uploaded_file, usecols)
+        if df is None:
+            return None, None
+        # Hash the file contents once per upload rather than the dataframe per call
+        digest = hashlib.blake2b(uploaded_file.getvalue(), digest_size=16).hexdigest()
+        # The same bytes parse differently as CSV and JSON, so the id includes the format
+        file_extension = uploaded_file.name.split('.')[-1].lower()
+        st.session_state.upload_signature = upload_signature
+        st.session_state.uploaded_df = df
+        st.session_state.df_id = f"{digest}:{file_extension}:{usecols}"
+
+    # The stored frame is returned as-is; clean_data copies it on a cache miss
+    return st.session_state.uploaded_df, st.session_state.df_id
+
+def to_numeric_if_mostly_numbers(series):
+    """Convert a text column to numbers when most of its values are numeric"""
+    if len(series) == 0:
+        return series
+
+    # Try to convert to numeric, if fails keep as categorical
+    try:
+        # Check a sample first so clearly textual columns skip the full conversion
+        sample = series.sample(min(len(series), CLEAN_SAMPLE_ROWS), random_state=0)
+        if pd.to_numeric(sample, errors='coerce').notna().mean() <= 0.5:
+            return series
+        numeric_values = pd.to_numeric(series, errors='coerce')
+    except (TypeError, ValueError):
+        return series
+
+    # Only convert if most values are numeric (>50%)
+    if numeric_values.notna().sum() / len(numeric_values) > 0.5:
+        return numeric_values
+    return series
+
+@st.cache_data(max_entries=4, show_spinner=False, hash_funcs=DATA_ID_HASH_FUNCS)
+def clean_data(df_id, df):
     """Clean and prepare data"""
     # Convert string numbers to float where possible
-    for column in df.columns:
-        if df[column].dtype == 'object':
-            # Try to convert to numeric, if fails keep as categorical
-            try:
-                numeric_values = pd.to_numeric(df[column], errors='coerce')
-                # Only convert if most values are numeric (>50%)
-                if numeric_values.notna().sum() / len(numeric_values) > 0.5:
-                    df[column] = numeric_values
-            except:
-                continue
+    original = [series for _, series in df.items()]
+    columns = [to_numeric_if_mostly_numbers(series) if is_categorical(series) else series
+               for series in original]
+
+    # Assemble the converted columns in one step instead of assigning them one by one
+    if any(new is not old for new, old in zip(columns, original)):
+        df = pd.concat(columns, axis=1)
+    else:
+        # Work on a copy so the upload kept in session state stays intact
+        df = df.copy()
+
+    # Lossless dtype shrinking so every later pass reads fewer bytes
+    return optimize_memory(df)
+
+def optimize_memory(df):
+    """Convert low-cardinality text to category and downcast integral numbers"""
+    if len(df) == 0:
+        return df
+
+    for column in df.select_dtypes(include=['object', 'string']).columns:
+        try:
+            # Repeated string values are stored once as categories
+            if df[column].nunique(dropna=False) / len(df) < 0.5:
+                df[column] = df[column].astype('category')
+        except TypeError:
+            # Unhashable values (e.g. nested JSON) stay as objects
+            continue
+
+    # Integer columns move to the smallest integer dtype
+    for column in df.select_dtypes(include='int64').columns:
+        df[column] = pd.to_numeric(df[column], downcast='integer')
+
+    # Float columns follow only when every value is exactly a whole number;
+    # to_numeric alone would round values within its 1e-8 tolerance
+    with np.errstate(invalid='ignore'):
+        for column in df.select_dtypes(include='float64').columns:
+            values = df[column].to_numpy()
+            if np.isfinite(values).all() and (values == np.trunc(values)).all():
+                df[column] = pd.to_numeric(df[column], downcast='integer')
+
+    return df
 
+def downcast_floats(df):
+    """Store float64 columns as float32, trading precision for memory"""
+    for column in df.select_dtypes(include='float64').columns:
+        df[column] = pd.to_numeric(df[column], downcast='float')
     return df
 
+def get_custom_fill_values(df, numeric_columns, custom_value):
+    """Map each column to the custom fill value in a type it can hold"""
+    numeric_value = pd.to_numeric(custom_value, errors='coerce')
+    fill_values = {}
+    for column, series in df.items():
+        if column in numeric_columns:
+            # Numeric columns are only filled when the value is a number
+            if not pd.isna(numeric_value):
+                fill_values[column] = numeric_value
+        elif is_categorical(series) and series.isna().any():
+            fill_values[column] = custom_value
+    return fill_values
+
 def handle_null_values(df, method, custom_value=None):
     """Handle null values in the dataframe"""
+    # Reduce only the numeric columns, then fill with one scalar per column
+    numeric_df = df.select_dtypes(include=np.number)
     if method == "Mean":
-        df.fillna(df.mean(), inplace=True)
+        fill_values = numeric_df.mean().to_dict()
     elif method == "Median":
-        df.fillna(df.median(), inplace=True)
+        fill_values = numeric_df.median().to_dict()
     elif method == "Mode":
-        df.fillna(df.mode().iloc[0], inplace=True)
+        modes = df.mode()
+        if modes.empty:
+            return df
+        fill_values = modes.iloc[0].to_dict()
     elif method == "Custom Value" and custom_value is not None:
-        df.fillna(custom_value, inplace=True)
+        fill_values = get_custom_fill_values(df, numeric_df.columns, custom_value)
+    else:
+        return df
+
+    # Categorical columns can only be filled with one of their categories
+    for column, value in fill_values.items():
+        series = df[column]
+        if (isinstance(series.dtype, pd.CategoricalDtype) and not pd.isna(value)
+                and value not in series.cat.categories and series.isna().any()):
+            df[column] = series.cat.add_categories([value])
+
+    df.fillna(fill_values, inplace=True)
     return df
 
 def get_numeric_columns(df):
@@ -59,30 +257,79 @@ def get_categorical_columns(df):
     """Get list of categorical columns"""
     return df.select_dtypes(exclude=[np.number]).columns.tolist()
 
-def prepare_categorical_plot_data(df, x_column, y_column, aggregation='mean'):
+def is_categorical(series):
+    """Check whether a column holds text or categorical values"""
+    return series.dtype.kind in CATEGORICAL_KINDS
+
+def get_schema(df):
+    """Map each column to its dtype kind character"""
+    return {column: dtype.kind for column, dtype in df.dtypes.items()}
+
+def get_column_lists(df_id, df):
+    """Get column names, numeric/categorical splits and schema for the data
+
+    The lists are kept in session state and rebuilt only when df_id changes.
+    """
+    if st.session_state.get('columns_df_id') != df_id:
+        st.session_state.columns_df_id = df_id
+        st.session_state.column_lists = (df.columns.tolist(), get_numeric_columns(df),
+                                         get_categorical_columns(df), get_schema(df))
+    return st.session_state.column_lists
+
+def aggregate_by_category(df, x_column, y_column, aggregation):
+    """Aggregate a numeric column per category, using Polars for large frames"""
+    if len(df) > POLARS_MIN_ROWS and isinstance(x_column, str) and isinstance(y_column, str):
+        try:
+            import polars as pl
+        except ImportError:
+            pl = None
+
+        if pl is not None:
+            # Multithreaded hash aggregation; null keys are dropped to match pandas.
+            # Columns Polars cannot convert (e.g. mixed ints and strings) fall
+            # through to the pandas groupby below
+            try:
+                agg_expr = getattr(pl.col(y_column), aggregation)()
+                return (pl.from_pandas(df[[x_column, y_column]]).lazy()
+                        .filter(pl.col(x_column).is_not_null())
+                        .group_by(x_column)
+                        .agg(agg_expr)
+                        .collect()
+                        .to_pandas())
+            except Exception:
+                pass
+
+    # The chart orders the categories itself, so skip sorting and unused category levels
+    return (df.groupby(x_column, sort=False, observed=True)[y_column]
+            .agg(aggregation).reset_index())
+
+def prepare_categorical_plot_data(df, schema, x_column, y_column, aggregation='mean'):
     """Prepare data for categorical plots by aggregating numerical values"""
-    if df[x_column].dtype == 'object' and df[y_column].dtype != 'object':
+    if schema[x_column] in CATEGORICAL_KINDS and schema[y_column] not in CATEGORICAL_KINDS:
         # Aggregate numerical values for each category
-        if aggregation == 'mean':
-            agg_df = df.groupby(x_column)[y_column].mean().reset_index()
-        elif aggregation == 'sum':
-            agg_df = df.groupby(x_column)[y_column].sum().reset_index()
-        elif aggregation == 'count':
-            agg_df = df.groupby(x_column)[y_column].count().reset_index()
-        return agg_df
+        return aggregate_by_category(df, x_column, y_column, aggregation)
     return df
 
-def create_visualization(df, chart_type, x_column, y_column, color_column=None, aggregation='mean'):
+def sample_for_plot(df, n=PLOT_SAMPLE_ROWS):
+    """Randomly sample rows for point-level plots on large datasets"""
+    return df if len(df) <= n else df.sample(n, random_state=0)
+
+@st.cache_data(max_entries=16, show_spinner=False, hash_funcs=DATA_ID_HASH_FUNCS)
+def create_visualization(df_id, df, schema, chart_type, x_column, y_column, color_column=None, aggregation='mean',
+                         top_n=COUNT_PLOT_MAX_CATEGORIES):
     """Create different types of visualizations"""
+    # Imported lazily so the app starts without loading Plotly
+    import plotly.express as px
+
     try:
         # Prepare data based on column types
         if x_column and y_column:  # For plots requiring both x and y
-            plot_df = prepare_categorical_plot_data(df, x_column, y_column, aggregation)
+            plot_df = prepare_categorical_plot_data(df, schema, x_column, y_column, aggregation)
         else:  # For plots requiring only one variable (like histograms)
             plot_df = df
 
         if chart_type == "Scatter Plot":
-            fig = px.scatter(plot_df, x=x_column, y=y_column, color=color_column,
+            fig = px.scatter(sample_for_plot(plot_df), x=x_column, y=y_column, color=color_column,
                            title=f"{x_column} vs {y_column}")
 
         elif chart_type == "Line Plot":
@@ -94,36 +341,60 @@ def create_visualization(df, chart_type, x_column, y_column, color_column=None,
                         title=f"{x_column} vs {y_column}")
 
         elif chart_type == "Box Plot":
-            fig = px.box(df, x=x_column, y=y_column, color=color_column,
+            fig = px.box(sample_for_plot(df), x=x_column, y=y_column, color=color_column,
                         title=f"Box Plot of {y_column} by {x_column}")
 
         elif chart_type == "Histogram":
-            fig = px.histogram(df, x=x_column, color=color_column,
-                             title=f"Histogram of {x_column}")
+            if color_column is None and schema[x_column] in NUMERIC_KINDS:
+                # Bin numeric data here so only bar heights reach the browser
+                values = df[x_column].dropna().to_numpy(dtype=np.float64)
+                values = values[np.isfinite(values)]
+                bins = max(1, min(HISTOGRAM_MAX_BINS, int(np.sqrt(values.size))))
+                counts, edges = np.histogram(values, bins=bins)
+                # '__count' cannot clash with a data column named 'count'
+                hist_df = pd.DataFrame({x_column: (edges[:-1] + edges[1:]) / 2, '__count': counts})
+                fig = px.bar(hist_df, x=x_column, y='__count', labels={'__count': 'Count'},
+                            title=f"Histogram of {x_column}")
+                fig.update_layout(bargap=0)
+            else:
+                fig = px.histogram(df, x=x_column, color=color_column,
+                                 title=f"Histogram of {x_column}")
 
         elif chart_type == "Pie Chart":
             # For pie charts, always aggregate the values
-            agg_df = df.groupby(x_column)[y_column].sum().reset_index()
+            agg_df = aggregate_by_category(df, x_column, y_column, 'sum')
             fig = px.pie(agg_df, values=y_column, names=x_column,
                         title=f"Pie Chart of {y_column} by {x_column}")
 
         elif chart_type == "Count Plot":
-            # Count plot for categorical variables
-            count_df = df[x_column].value_counts().reset_index()
-            count_df.columns = [x_column, 'count']
-            fig = px.bar(count_df, x=x_column, y='count',
+            # Count plot for categorical variables, keeping the most frequent
+            # categories and folding the long tail into a single bar
+            counts = df[x_column].value_counts()
+            top_counts = counts.head(top_n)
+            other_count = counts.iloc[top_n:].sum()
+            if other_count:
+                # Naming the number of folded categories keeps the label
+                # distinct from a real category called "Other"
+                other_label = f"Other ({len(counts) - top_n} categories)"
+                top_counts = pd.concat([top_counts, pd.Series({other_label: other_count})])
+            # '__count' cannot clash with a data column named 'count'
+            count_df = pd.DataFrame({x_column: top_counts.index.astype(str),
+                                     '__count': top_counts.to_numpy()})
+            fig = px.bar(count_df, x=x_column, y='__count', labels={'__count': 'Count'},
                         title=f"Count Plot of {x_column}")
 
-        # Update layout
+        # Update layout; count plot bars already arrive sorted by frequency
+        x_is_categorical = schema[x_column] in CATEGORICAL_KINDS
+        sort_categories = x_is_categorical and chart_type != "Count Plot"
         fig.update_layout(
             template="plotly_white",
             xaxis_title=x_column,
             yaxis_title=y_column if y_column else "Count",
-            xaxis={'categoryorder':'total descending'} if df[x_column].dtype == 'object' else None
+            xaxis={'categoryorder':'total descending'} if sort_categories else None
         )
 
         # Rotate x-axis labels if categorical
-        if df[x_column].dtype == 'object':
+        if x_is_categorical:
             fig.update_xaxes(tickangle=45)
 
         return fig
@@ -131,7 +402,75 @@ def create_visualization(df, chart_type, x_column, y_column, color_column=None,
         st.error(f"Error creating visualization: {str(e)}")
         return None
 
-def show_data_insights(df):
+@st.cache_data(max_entries=4, show_spinner=False, hash_funcs=DATA_ID_HASH_FUNCS)
+def count_nulls(df_id, df):
+    """Count null values in each column"""
+    return df.isnull().sum()
+
+@st.cache_data(max_entries=4, show_spinner=False, hash_funcs=DATA_ID_HASH_FUNCS)
+def summarize_columns(df_id, df, numeric_cols, categorical_cols):
+    """Compute numeric summary statistics and top values of categorical columns"""
+    summary = df[numeric_cols].describe() if numeric_cols else None
+    top_values = {col: df[col].value_counts().head() for col in categorical_cols}
+    return summary, top_values
+
+@st.cache_data(max_entries=4, show_spinner=False, hash_funcs=DATA_ID_HASH_FUNCS)
+def to_csv_bytes(df_id, df):
+    """Serialize a dataframe to UTF-8 CSV bytes for download"""
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+    except ImportError:
+        return df.to_csv(index=False).encode('utf-8')
+
+    # Arrow writes bools as true/false, datetimes with microseconds and
+    # durations as seconds, so such columns get pandas' text form first
+    text_columns = {}
+    for column, series in df.items():
+        values = series.cat.categories if isinstance(series.dtype, pd.CategoricalDtype) else series
+        if values.dtype.kind not in NUMERIC_KINDS and pd.api.types.infer_dtype(values, skipna=True) != 'string':
+            text_columns[column] = series.astype(str).where(series.notna())
+    if text_columns:
+        df = df.copy(deep=False)
+        for column, values in text_columns.items():
+            df[column] = values
+
+    # pyarrow's multithreaded writer produces the bytes directly. Unlike
+    # to_csv it quotes the header and every string field and drops the '.0'
+    # of whole floats; values read back the same. Columns Arrow cannot
+    # represent fall back to the pandas writer
+    try:
+        buffer = io.BytesIO()
+        pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), buffer,
+                         pa_csv.WriteOptions(quoting_style='needed'))
+        return buffer.getvalue()
+    except pa.ArrowException:
+        return df.to_csv(index=False).encode('utf-8')
+
+def search_rows(df, search_term):
+    """Keep rows where any column contains the search term (case-insensitive)"""
+    mask = np.zeros(len(df), dtype=bool)
+    for _, series in df.items():
+        mask |= contains_term(series, search_term)
+    return df[mask]
+
+def contains_term(series, search_term):
+    """Flag the values of a column whose text contains the search term"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Search each category once and map the result onto the rows;
+        # the appended False is picked up by the -1 code of missing values
+        categories = series.cat.categories.astype(str)
+        matches = np.asarray(categories.str.contains(search_term, case=False, regex=False), dtype=bool)
+        return np.append(matches, False)[series.cat.codes.to_numpy()]
+
+    # Only columns holding nothing but strings are searched directly;
+    # dates, numbers and mixed values are converted to text first
+    if pd.api.types.infer_dtype(series, skipna=True) != 'string':
+        series = series.astype(str)
+    matches = series.str.contains(search_term, case=False, regex=False, na=False)
+    return matches.to_numpy(dtype=bool)
+
+def show_data_insights(df_id, df, numeric_cols, categorical_cols, null_counts):
     """Show basic data insights"""
     st.subheader("Data Insights")
 
@@ -142,23 +481,116 @@ def show_data_insights(df):
     st.write("Data Types:")
     st.write(df.dtypes)
 
+    summary, top_values = summarize_columns(df_id, df, numeric_cols, categorical_cols)
+
     # Summary statistics for numeric columns
-    numeric_cols = get_numeric_columns(df)
     if numeric_cols:
         st.write("Summary Statistics (Numeric Columns):")
-        st.write(df[numeric_cols].describe())
+        st.write(summary)
 
     # Categorical columns analysis
-    categorical_cols = get_categorical_columns(df)
     if categorical_cols:
         st.write("Categorical Columns Analysis:")
         for col in categorical_cols:
             st.write(f"\nUnique values in {col}:")
-            st.write(df[col].value_counts().head())
+            st.write(top_values[col])
 
     # Missing values
     st.write("Missing Values:")
-    st.write(df.isnull().sum())
+    st.write(null_counts)
+
+@st.fragment
+def visualization_panel(df_id, df, all_columns, numeric_columns, categorical_columns, schema):
+    """Chart controls and figure; widget changes rerun only this panel"""
+    st.subheader("Data Visualization")
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        chart_type = st.selectbox(
+            "Select Chart Type",
+            ["Bar Plot", "Scatter Plot", "Line Plot", "Box Plot",
+             "Histogram", "Pie Chart", "Count Plot"]
+        )
+
+    with col2:
+        if chart_type == "Count Plot":
+            x_column = st.selectbox("Select Category", categorical_columns)
+            y_column = None
+        elif chart_type == "Histogram":
+            x_column = st.selectbox("Select Column", all_columns)
+            y_column = None
+        else:
+            x_column = st.selectbox("Select X-axis", all_columns)
+            if chart_type == "Pie Chart":
+                y_column = st.selectbox("Select Values", numeric_columns)
+            else:
+                y_column = st.selectbox("Select Y-axis", numeric_columns)
+
+    with col3:
+        if chart_type not in ["Pie Chart", "Count Plot"]:
+            color_column = st.selectbox("Select Color Column (optional)",
+                                      ["None"] + categorical_columns)
+            color_column = None if color_column == "None" else color_column
+
+            if x_column in categorical_columns and y_column in numeric_columns:
+                aggregation = st.selectbox(
+                    "Select Aggregation Method",
+                    ["mean", "sum", "count"],
+                    help="How to aggregate numerical values for each category"
+                )
+            else:
+                aggregation = "mean"
+        else:
+            color_column = None
+            aggregation = "sum"
+
+        if chart_type == "Count Plot":
+            top_n = st.slider("Top N categories", 5, 200, COUNT_PLOT_MAX_CATEGORIES,
+                              help="Less frequent categories are grouped as \"Other\"")
+        else:
+            top_n = COUNT_PLOT_MAX_CATEGORIES
+
+    # Create and display visualization
+    fig = create_visualization(df_id, df, schema, chart_type, x_column, y_column,
+                            color_column, aggregation, top_n)
+
+    if fig is not None:
+        st.plotly_chart(fig, use_container_width=True)
+
+@st.fragment
+def filter_panel(df_id, df, all_columns):
+    """Column selection, search and download; widget changes rerun only this panel"""
+    st.subheader("Data Filtering")
+
+    # Column selection
+    selected_columns = st.multiselect(
+        "Select columns to display",
+        all_columns,
+        default=all_columns
+    )
+
+    # Text search
+    search_term = st.text_input("Search in data")
+
+    # Filter data based on selection and search; the default full selection
+    # reuses df instead of copying every column
+    filtered_df = df if selected_columns == all_columns else df.loc[:, selected_columns]
+    if search_term:
+        filtered_df = search_rows(filtered_df, search_term)
+
+    # Show filtered data; only the first rows are sent to the browser
+    preview_rows = st.slider("Rows to preview", 100, 100_000, PREVIEW_MAX_ROWS, step=100)
+    st.write(f"Filtered Data ({len(filtered_df):,} rows):")
+    st.dataframe(filtered_df.head(preview_rows), use_container_width=True)
+
+    # Download filtered data
+    st.download_button(
+        label="Download filtered data as CSV",
+        data=to_csv_bytes(f"{df_id}:{selected_columns}:{search_term}", filtered_df),
+        file_name='filtered_data.csv',
+        mime='text/csv',
+    )
 
 def main():
     st.set_page_config(page_title="Data Analysis Tool", layout="wide")
@@ -171,22 +603,32 @@ def main():
 
     if uploaded_file is not None:
         # Load and clean data
-        df = load_data(uploaded_file)
+        df, df_id = get_uploaded_data(uploaded_file)
 
         if df is not None:
-            df = clean_data(df)
+            df = clean_data(df_id, df)
+
+            # Every transformation below extends df_id so cached results stay distinct
+            if st.sidebar.checkbox("Optimize memory",
+                                   help="Store decimal columns as float32 (lower precision)"):
+                df = downcast_floats(df)
+                df_id += ":float32"
+
+            # Split columns by type once per dataset
+            all_columns, numeric_columns, categorical_columns, schema = get_column_lists(df_id, df)
+            null_counts = count_nulls(df_id, df)
 
             # Show raw data
             st.subheader("Raw Data Preview")
             st.write(df.head())
 
             # Data insights
-            show_data_insights(df)
+            show_data_insights(df_id, df, numeric_columns, categorical_columns, null_counts)
 
             # Data cleaning options
             st.subheader("Data Cleaning")
             st.write("Number of Null Values in Each Column:")
-            st.write(df.isnull().sum())
+            st.write(null_counts)
 
             null_method = st.selectbox("Handle Null Values", ["None", "Mean", "Median", "Mode", "Custom Value"])
             if null_method == "Custom Value":
@@ -195,96 +637,14 @@ def main():
                 custom_value = None
             if st.button("Apply Null Handling"):
                 df = handle_null_values(df, null_method, custom_value)
+                df_id += f":nulls={null_method}:{custom_value}"
                 st.write("Null values handled successfully!")
 
             # Visualization options
-            st.subheader("Data Visualization")
-
-            col1, col2, col3 = st.columns(3)
-
-            with col1:
-                chart_type = st.selectbox(
-                    "Select Chart Type",
-                    ["Bar Plot", "Scatter Plot", "Line Plot", "Box Plot",
-                     "Histogram", "Pie Chart", "Count Plot"]
-                )
-
-            with col2:
-                numeric_columns = get_numeric_columns(df)
-                categorical_columns = get_categorical_columns(df)
-                all_columns = df.columns.tolist()
-
-                if chart_type == "Count Plot":
-                    x_column = st.selectbox("Select Category", categorical_columns)
-                    y_column = None
-                elif chart_type == "Histogram":
-                    x_column = st.selectbox("Select Column", all_columns)
-                    y_column = None
-                else:
-                    x_column = st.selectbox("Select X-axis", all_columns)
-                    if chart_type == "Pie Chart":
-                        y_column = st.selectbox("Select Values", numeric_columns)
-                    else:
-                        y_column = st.selectbox("Select Y-axis", numeric_columns)
-
-            with col3:
-                if chart_type not in ["Pie Chart", "Count Plot"]:
-                    color_column = st.selectbox("Select Color Column (optional)",
-                                              ["None"] + categorical_columns)
-                    color_column = None if color_column == "None" else color_column
-
-                    if x_column in categorical_columns and y_column in numeric_columns:
-                        aggregation = st.selectbox(
-                            "Select Aggregation Method",
-                            ["mean", "sum", "count"],
-                            help="How to aggregate numerical values for each category"
-                        )
-                    else:
-                        aggregation = "mean"
-                else:
-                    color_column = None
-                    aggregation = "sum"
-
-            # Create and display visualization
-            fig = create_visualization(df, chart_type, x_column, y_column,
-                                    color_column, aggregation)
-
-            if fig is not None:
-                st.plotly_chart(fig, use_container_width=True)
+            visualization_panel(df_id, df, all_columns, numeric_columns, categorical_columns, schema)
 
             # Data filtering
-            st.subheader("Data Filtering")
-
-            # Column selection
-            selected_columns = st.multiselect(
-                "Select columns to display",
-                df.columns.tolist(),
-                default=df.columns.tolist()
-            )
-
-            # Text search
-            search_term = st.text_input("Search in data")
-
-            # Filter data based on selection and search
-            filtered_df = df[selected_columns]
-            if search_term:
-                filtered_df = filtered_df[
-                    filtered_df.astype(str).apply(
-                        lambda x: x.str.contains(search_term, case=False)
-                    ).any(axis=1)
-                ]
-
-            # Show filtered data
-            st.write("Filtered Data:")
-            st.write(filtered_df)
-
-            # Download filtered data
-            st.download_button(
-                label="Download filtered data as CSV",
-                data=filtered_df.to_csv(index=False).encode('utf-8'),
-                file_name='filtered_data.csv',
-                mime='text/csv',
-            )
+            filter_panel(df_id, df, all_columns)
 
 if __name__ == "__main__":
     main()